@@ -40,9 +40,26 @@ function toast(msg) {
   setTimeout(() => el.classList.remove("show"), 2200);
 }
 
+// Memo de textos ya parseados (valores repetidos como "0", "90"); se vacía al llenarse
+const PARSE_NUM_CACHE_MAX = 1024;
+const parseNumCache = new Map();
+
 function parseNum(str) {
   if (str === null || str === undefined) return NaN;
-  return Number(String(str).trim().replace(",", "."));
+  if (typeof str === "number") return str;
+  const key = String(str);
+  let v = parseNumCache.get(key);
+  if (v === undefined) {
+    v = Number(key.trim().replace(",", "."));
+    if (parseNumCache.size >= PARSE_NUM_CACHE_MAX) parseNumCache.clear();
+    parseNumCache.set(key, v);
+  }
+  return v;
+}
+
+// "311.87 312,1; 313" -> [311.87, 312.1, 313] (separa por espacios o ;)
+function parseNumList(str) {
+  return String(str ?? "").trim().split(/[\s;]+/).filter(Boolean).map(parseNum);
 }
 
 function fmt(n, d = 3) {
@@ -71,15 +88,19 @@ function uid(prefix = "prj") {
 // Convención: 0°=Norte(+Y), 90°=Este(+X)
 // AV: inclinación respecto a horizontal (+ arriba)
 // =====================================================
-const d2r = (deg) => deg * Math.PI / 180;
-const r2d = (rad) => rad * 180 / Math.PI;
-const wrap360 = (a) => ((a % 360) + 360) % 360;
-const wrap180 = (a) => ((a + 180) % 360) - 180;
-
+const DEG2RAD = Math.PI / 180;
+const RAD2DEG = 180 / Math.PI;
+const d2r = (deg) => deg * DEG2RAD;
+const r2d = (rad) => rad * RAD2DEG;
+// En JS el signo de % sigue al dividendo: solo los negativos necesitan ajuste
+const wrap360 = (a) => { const r = a % 360; return r < 0 ? (r + 360) % 360 : r; };
+const wrap180 = (a) => { const r = wrap360(a); return r > 180 ? r - 360 : r; };
+
+// Acepta Array o Float64Array; sin/cos son periódicos, no requiere wrap360 previo
 function meanAngleDeg(anglesDeg) {
   let s = 0, c = 0;
-  for (const a of anglesDeg) {
-    const ar = d2r(a);
+  for (let i = 0, n = anglesDeg.length; i < n; i++) {
+    const ar = d2r(anglesDeg[i]);
     s += Math.sin(ar);
     c += Math.cos(ar);
   }
@@ -87,18 +108,34 @@ function meanAngleDeg(anglesDeg) {
   return wrap360(r2d(Math.atan2(s, c)));
 }
 
-function azimutXY(cam, pt) {
-  const dx = pt.X - cam.X;
-  const dy = pt.Y - cam.Y;
-  return wrap360(r2d(Math.atan2(dx, dy)));
+// atan2 rápido: polinomio minimax de Abramowitz & Stegun 4.4.49 en [0,1]
+// (|ε| ≤ 2e-8 rad ≈ 4e-6°, bajo la resolución de 4 decimales que se reporta).
+// Las aproximaciones cúbicas (~0.005 rad ≈ 0.3°) no sirven para geomensura.
+const USE_FAST_ATAN2 = true;
+
+function fastAtan2(y, x) {
+  const ax = Math.abs(x), ay = Math.abs(y);
+  const mx = ax > ay ? ax : ay;
+  if (mx === 0) return 0;
+  const t = (ax > ay ? ay : ax) / mx;
+  const t2 = t * t;
+  let r = t * (1 + t2 * (-0.3333314528 + t2 * (0.1999355085 + t2 * (-0.1420889944
+    + t2 * (0.1065626393 + t2 * (-0.0752896400 + t2 * (0.0429096138
+    + t2 * (-0.0161657367 + t2 * 0.0028662257))))))));
+  if (ay > ax) r = Math.PI / 2 - r;
+  if (x < 0) r = Math.PI - r;
+  return y < 0 ? -r : r;
 }
 
-function inclinacion(cam, pt) {
-  const dx = pt.X - cam.X;
-  const dy = pt.Y - cam.Y;
-  const dz = pt.Z - cam.Z;
-  const dh = Math.hypot(dx, dy);
-  return r2d(Math.atan2(dz, dh));
+const atan2 = USE_FAST_ATAN2 ? fastAtan2 : Math.atan2;
+
+// Kernels escalares (solo números, sin objetos): monomórficos para el JIT
+function azimutD(dx, dy) {
+  return wrap360(r2d(atan2(dx, dy)));
+}
+
+function inclinacionD(dx, dy, dz) {
+  return r2d(atan2(dz, Math.hypot(dx, dy)));
 }
 
 function calcXYZ(cam, ahDeg, avDeg, dist) {
@@ -138,37 +175,66 @@ function normalizeConfig(cfg) {
     return out;
   });
 
-  return { camera, collimation_points };
+  return { camera, collimation_points, geom: buildGeom(camera, collimation_points) };
 }
 
-function calibrate(cfg) {
-  const cam = cfg.camera;
-  const pts = cfg.collimation_points;
-
-  const deltasAh = [];
-  const deltasAv = [];
-  const diagnostics = [];
+// Precálculo al normalizar (SoA, Float64Array): deltas y distancia geométrica
+// respecto a la cámara, y ángulos observados. Solo cambian con la config.
+function buildGeom(cam, pts) {
+  const n = pts.length;
+  const dx = new Float64Array(n), dy = new Float64Array(n), dz = new Float64Array(n);
+  const dist = new Float64Array(n);
+  const ahObs = new Float64Array(n), avObs = new Float64Array(n), dObs = new Float64Array(n);
+  for (let i = 0; i < n; i++) {
+    const p = pts[i];
+    dx[i] = p.X - cam.X;
+    dy[i] = p.Y - cam.Y;
+    dz[i] = p.Z - cam.Z;
+    dist[i] = Math.hypot(dx[i], dy[i], dz[i]); // sin overflow/underflow intermedio
+    ahObs[i] = p.AH_obs;
+    avObs[i] = p.AV_obs;
+    dObs[i] = p.D_obs ?? 0;
+  }
+  return { n, dx, dy, dz, dist, ahObs, avObs, dObs };
+}
 
-  for (const p of pts) {
-    const ahReal = azimutXY(cam, p);
-    const avReal = inclinacion(cam, p);
+// Cache de config normalizada por identidad del JSON crudo: configRaw de un
+// proyecto solo se reemplaza (nunca se muta), así que la identidad basta
+// para saber si cambió. El resultado se trata como inmutable.
+const normalizedConfigs = new WeakMap();
+
+function loadConfig(raw) {
+  const hit = (raw && typeof raw === "object") ? normalizedConfigs.get(raw) : undefined;
+  if (hit) return hit;
+  const cfg = normalizeConfig(raw);
+  normalizedConfigs.set(raw, cfg);
+  return cfg;
+}
 
-    const dAH = wrap180(ahReal - p.AH_obs);
-    const dAV = avReal - p.AV_obs;
+function calibrate(cfg) {
+  const pts = cfg.collimation_points;
+  // Arreglos precalculados en normalizeConfig -> un solo pase numérico
+  const { n, dx, dy, dz, dist, ahObs, avObs, dObs } = cfg.geom;
 
-    deltasAh.push(dAH);
-    deltasAv.push(dAV);
+  const deltasAh = new Float64Array(n);
+  const deltasAv = new Float64Array(n);
+  const distRes = new Float64Array(n);
 
-    const dx = p.X - cam.X, dy = p.Y - cam.Y, dz = p.Z - cam.Z;
-    const distGeom = Math.sqrt(dx * dx + dy * dy + dz * dz);
-    const distRes = distGeom - (p.D_obs ?? 0);
+  for (let i = 0; i < n; i++) {
+    const ahReal = azimutD(dx[i], dy[i]);
+    const avReal = inclinacionD(dx[i], dy[i], dz[i]);
 
-    diagnostics.push({ name: p.name, dAH, dAV, Dist_res: distRes });
+    deltasAh[i] = wrap180(ahReal - ahObs[i]);
+    deltasAv[i] = avReal - avObs[i];
+    distRes[i] = dist[i] - dObs[i];
   }
 
+  const diagnostics = pts.map((p, i) => ({
+    name: p.name, dAH: deltasAh[i], dAV: deltasAv[i], Dist_res: distRes[i]
+  }));
+
   // Promedio circular para ΔAH
-  const deltas0360 = deltasAh.map(wrap360);
-  let ajusteAh = meanAngleDeg(deltas0360);
+  let ajusteAh = meanAngleDeg(deltasAh);
   ajusteAh = wrap180(ajusteAh);
 
   // Promedio simple para ΔAV
@@ -177,6 +243,19 @@ function calibrate(cfg) {
   return { ajuste_ah: ajusteAh, ajuste_av: ajusteAv, diagnostics, n_points: pts.length };
 }
 
+// La calibración depende solo de la config normalizada (inmutable, cacheada
+// en loadConfig): cambiar de proyecto o re-hidratar no la recalcula.
+const calibrations = new WeakMap();
+
+function calibrationFor(cfg) {
+  let cal = calibrations.get(cfg);
+  if (!cal) {
+    cal = calibrate(cfg);
+    calibrations.set(cfg, cal);
+  }
+  return cal;
+}
+
 function computePoint(cfg, cal, AH_obs, AV_obs, D_obs) {
   const ahCorr = wrap360(AH_obs + cal.ajuste_ah);
   const avCorr = AV_obs + cal.ajuste_av;
@@ -189,6 +268,14 @@ function computePoint(cfg, cal, AH_obs, AV_obs, D_obs) {
   };
 }
 
+// Lote: correcciones y cámara compartidas para N observaciones
+function computePoints(cfg, cal, ahObs, avObs, dObs) {
+  const n = ahObs.length;
+  const out = new Array(n);
+  for (let i = 0; i < n; i++) out[i] = computePoint(cfg, cal, ahObs[i], avObs[i], dObs[i]);
+  return out;
+}
+
 // =====================================================
 // CRS & reprojection (UTM->WGS84)
 // Requires proj4 loaded in index.html
@@ -343,12 +430,17 @@ function worldToPixel(x, y, wld) {
   return { col, row };
 }
 
-async function drawBackgroundImage(ctx, imgUrl, w, h) {
+// Draw generation: a redraw that finishes after a newer one started must not paint
+let drawGen = 0;
+const isStaleDraw = (gen) => gen !== drawGen;
+
+async function drawBackgroundImage(ctx, imgUrl, w, h, gen) {
   if (!imgUrl) return null;
   const img = new Image();
   img.crossOrigin = "anonymous";
   img.src = imgUrl;
   await img.decode();
+  if (isStaleDraw(gen)) return null;
   ctx.drawImage(img, 0, 0, w, h);
   return { w: img.naturalWidth || img.width, h: img.naturalHeight || img.height };
 }
@@ -374,8 +466,7 @@ function drawPointsAndLine(ctx, pixPts) {
   });
 }
 
-function drawExtents(ctx, w, h) {
-  const pts = state.points;
+function drawExtents(ctx, w, h, pts) {
   clearCanvas(ctx, w, h);
 
   // Grid light
@@ -408,21 +499,21 @@ function drawExtents(ctx, w, h) {
   drawPointsAndLine(ctx, pixPts);
 }
 
-async function drawKmz(ctx, w, h) {
+async function drawKmz(ctx, w, h, pts, m, crs, gen) {
   clearCanvas(ctx, w, h);
-  const m = state.map;
   if (!m.imageUrl || !m.bbox4326) {
-    drawExtents(ctx, w, h);
+    drawExtents(ctx, w, h, pts);
     return;
   }
 
-  await drawBackgroundImage(ctx, m.imageUrl, w, h);
+  await drawBackgroundImage(ctx, m.imageUrl, w, h, gen);
+  if (isStaleDraw(gen)) return;
 
-  if (!state.points.length) return;
+  if (!pts.length) return;
 
   const pixPts = [];
-  for (const p of state.points) {
-    const { lon, lat } = toLonLat(p.X, p.Y, state.crs);
+  for (const p of pts) {
+    const { lon, lat } = toLonLat(p.X, p.Y, crs);
     const q = lonLatToPixel(lon, lat, m.bbox4326, w, h);
     pixPts.push(q);
   }
@@ -430,22 +521,26 @@ async function drawKmz(ctx, w, h) {
   drawPointsAndLine(ctx, pixPts);
 }
 
-async function drawImageWorld(ctx, w, h) {
+async function drawImageWorld(ctx, w, h, pts, m, gen) {
   clearCanvas(ctx, w, h);
-  const m = state.map;
 
   // draw background if present
   if (m.imageUrl) {
-    const imgSz = await drawBackgroundImage(ctx, m.imageUrl, w, h);
-    if (imgSz) m.imgSize = imgSz;
+    const imgSz = await drawBackgroundImage(ctx, m.imageUrl, w, h, gen);
+    if (isStaleDraw(gen)) return;
+    if (imgSz) {
+      m.imgSize = imgSz;
+      // publish back only if the same image is still active
+      if (state.map.imageUrl === m.imageUrl) state.map.imgSize = imgSz;
+    }
   } else {
-    drawExtents(ctx, w, h);
+    drawExtents(ctx, w, h, pts);
     return;
   }
 
   // without worldfile, just show extents overlay (approx)
   if (!m.world) {
-    drawExtents(ctx, w, h);
+    drawExtents(ctx, w, h, pts);
     return;
   }
 
@@ -455,7 +550,7 @@ async function drawImageWorld(ctx, w, h) {
   const imgH = (m.imgSize?.h) || h;
 
   const pixPts = [];
-  for (const p of state.points) {
+  for (const p of pts) {
     const pr = worldToPixel(p.X, p.Y, m.world);
     if (!pr) continue;
     // pr.col/pr.row are in image pixel coords
@@ -477,13 +572,20 @@ async function drawMap() {
 
   const w = c.width, h = c.height;
 
+  // Snapshot: writers replace state.points (never mutate it), so after each
+  // await we keep drawing one consistent state; gen drops superseded redraws
+  const gen = ++drawGen;
+  const pts = state.points;
+  const m = { ...state.map };
+  const crs = state.crs;
+
   try {
-    if (state.map.mode === "kmz") await drawKmz(ctx, w, h);
-    else if (state.map.mode === "image_wld") await drawImageWorld(ctx, w, h);
-    else drawExtents(ctx, w, h);
+    if (m.mode === "kmz") await drawKmz(ctx, w, h, pts, m, crs, gen);
+    else if (m.mode === "image_wld") await drawImageWorld(ctx, w, h, pts, m, gen);
+    else drawExtents(ctx, w, h, pts);
   } catch (e) {
     console.error(e);
-    drawExtents(ctx, w, h);
+    if (!isStaleDraw(gen)) drawExtents(ctx, w, h, pts);
   }
 }
 
@@ -578,8 +680,8 @@ function hydrateFromProject(p) {
     state.nextId = Number.isFinite(p.nextId) ? p.nextId : (state.points.length + 1);
 
     // normalize config from raw
-    state.config = normalizeConfig(p.configRaw);
-    state.calibration = calibrate(state.config);
+    state.config = loadConfig(p.configRaw);
+    state.calibration = calibrationFor(state.config);
 
     renderCalibration();
     renderPoints();
@@ -602,7 +704,8 @@ function hydrateFromProject(p) {
 // Static config.json bootstrap (creates first project)
 // =====================================================
 async function fetchConfigJson() {
-  const r = await fetch("./config.json", { cache: "no-store" });
+  // no-cache: siempre revalida (ETag/Last-Modified), pero acepta 304 sin cuerpo
+  const r = await fetch("./config.json", { cache: "no-cache" });
   if (!r.ok) throw new Error("No se pudo cargar config.json");
   return await r.json();
 }
@@ -653,11 +756,14 @@ function calibrateNow() {
 }
 
 function addPoint() {
-  const ah = parseNum($("inAh").value);
-  const av = parseNum($("inAv").value);
-  const d = parseNum($("inD").value);
-
-  if (![ah, av, d].every(Number.isFinite)) {
+  // Cada campo acepta uno o varios valores (lote), en el mismo orden.
+  // Con a lo más un valor por campo se usa parseNum tal cual (vacío = 0).
+  const raw = [$("inAh").value, $("inAv").value, $("inD").value];
+  const lists = raw.map(parseNumList);
+  const [ahs, avs, ds] = lists.every((l) => l.length <= 1) ? raw.map((v) => [parseNum(v)]) : lists;
+
+  const n = ahs.length;
+  if (!n || avs.length !== n || ds.length !== n || ![...ahs, ...avs, ...ds].every(Number.isFinite)) {
     toast("Revisa AH/AV/Distancia (números válidos).");
     return;
   }
@@ -667,24 +773,58 @@ function addPoint() {
   }
 
   try {
-    const r = computePoint(state.config, state.calibration, ah, av, d);
-    const p = {
+    const rs = computePoints(state.config, state.calibration, ahs, avs, ds);
+    const added = rs.map((r) => ({
       ID: state.nextId++,
       X: r.X, Y: r.Y, Z: r.Z,
       AH_obs: r.AH_obs, AV_obs: r.AV_obs, D_obs: r.D_obs,
       AH_corr: r.AH_corr, AV_corr: r.AV_corr
-    };
-    state.points.push(p);
+    }));
+    const p = added[added.length - 1];
+    // copy-on-publish: nueva lista, un drawMap en curso conserva la anterior
+    state.points = state.points.concat(added);
+    // persistencia + render una sola vez por lote
     persistActiveProject();
     renderPoints();
     drawMap();
-    toast(`Punto ${p.ID} agregado.`);
+    toast(n === 1 ? `Punto ${p.ID} agregado.` : `${n} puntos agregados.`);
   } catch (e) {
     console.error(e);
     toast("No se pudo calcular el punto.");
   }
 }
 
+const EXPORT_HEADERS = ["ID", "X", "Y", "Z", "AH_obs", "AV_obs", "D_obs", "AH_corr", "AV_corr"];
+
+// Formateador de fila por (sep, dec), construido una vez y reutilizado:
+// una sola plantilla por fila y el decimal se cambia una vez (no por celda).
+const rowFormatters = new Map();
+
+function rowFormatter(sep, dec) {
+  const key = `${sep}|${dec}`;
+  let fmtRow = rowFormatters.get(key);
+  if (!fmtRow) {
+    const swapDec = dec !== ".";
+    fmtRow = (p) => {
+      const nums =
+        `${Number(p.X).toFixed(3)}${sep}${Number(p.Y).toFixed(3)}${sep}${Number(p.Z).toFixed(3)}${sep}` +
+        `${Number(p.AH_obs).toFixed(4)}${sep}${Number(p.AV_obs).toFixed(4)}${sep}${Number(p.D_obs).toFixed(3)}${sep}` +
+        `${Number(p.AH_corr).toFixed(4)}${sep}${Number(p.AV_corr).toFixed(4)}`;
+      return `${p.ID}${sep}${swapDec ? nums.replace(/\./g, dec) : nums}\n`;
+    };
+    rowFormatters.set(key, fmtRow);
+  }
+  return fmtRow;
+}
+
+// Filas TXT/CSV. Una parte por línea: el Blob las concatena sin un string intermedio.
+function exportLines(sep, dec) {
+  const fmtRow = rowFormatter(sep, dec);
+  const lines = [EXPORT_HEADERS.join(sep) + "\n"];
+  for (const p of state.points) lines.push(fmtRow(p));
+  return lines;
+}
+
 function exportTxt() {
   if (state.points.length === 0) return toast("No hay puntos para exportar.");
 
@@ -694,29 +834,9 @@ function exportTxt() {
   const fnameIn = ($("inFile").value || "puntos_calculados.txt").trim();
   const fname = fnameIn.toLowerCase().endsWith(".txt") ? fnameIn : (fnameIn + ".txt");
 
-  const headers = ["ID", "X", "Y", "Z", "AH_obs", "AV_obs", "D_obs", "AH_corr", "AV_corr"];
-
-  const fmtDec = (num, nd) => {
-    const s = Number(num).toFixed(nd);
-    return dec === "," ? s.replace(".", ",") : s;
-  };
-
-  const lines = [headers.join(sep)];
-  for (const p of state.points) {
-    lines.push([
-      String(p.ID),
-      fmtDec(p.X, 3),
-      fmtDec(p.Y, 3),
-      fmtDec(p.Z, 3),
-      fmtDec(p.AH_obs, 4),
-      fmtDec(p.AV_obs, 4),
-      fmtDec(p.D_obs, 3),
-      fmtDec(p.AH_corr, 4),
-      fmtDec(p.AV_corr, 4),
-    ].join(sep));
-  }
+  const lines = exportLines(sep, dec);
 
-  downloadText(lines.join("\n") + "\n", fname, "text/plain;charset=utf-8");
+  downloadText(lines, fname, "text/plain;charset=utf-8");
   toast("TXT exportado.");
 }
 
@@ -729,29 +849,9 @@ function exportCSV() {
   const fnameIn = ($("inFile").value || "puntos_calculados").trim().replace(/\.txt$/i, "");
   const fname = fnameIn.toLowerCase().endsWith(".csv") ? fnameIn : (fnameIn + ".csv");
 
-  const headers = ["ID", "X", "Y", "Z", "AH_obs", "AV_obs", "D_obs", "AH_corr", "AV_corr"];
-
-  const fmtDec = (num, nd) => {
-    const s = Number(num).toFixed(nd);
-    return dec === "," ? s.replace(".", ",") : s;
-  };
-
-  const lines = [headers.join(sep)];
-  for (const p of state.points) {
-    lines.push([
-      String(p.ID),
-      fmtDec(p.X, 3),
-      fmtDec(p.Y, 3),
-      fmtDec(p.Z, 3),
-      fmtDec(p.AH_obs, 4),
-      fmtDec(p.AV_obs, 4),
-      fmtDec(p.D_obs, 3),
-      fmtDec(p.AH_corr, 4),
-      fmtDec(p.AV_corr, 4),
-    ].join(sep));
-  }
+  const lines = exportLines(sep, dec);
 
-  downloadText(lines.join("\n") + "\n", fname, "text/csv;charset=utf-8");
+  downloadText(lines, fname, "text/csv;charset=utf-8");
   toast("CSV exportado.");
 }
 
@@ -794,8 +894,9 @@ function clearPoints() {
   toast("Lista limpiada.");
 }
 
+// content: string o arreglo de partes (se pasan directo al Blob)
 function downloadText(content, filename, mime) {
-  const blob = new Blob([content], { type: mime });
+  const blob = new Blob(Array.isArray(content) ? content : [content], { type: mime });
   const url = URL.createObjectURL(blob);
   const a = document.createElement("a");
   a.href = url;
@@ -831,7 +932,7 @@ function saveConfig() {
   try {
     const txt = $("configEditor").value;
     const cfgRaw = JSON.parse(txt);
-    const cfg = normalizeConfig(cfgRaw);
+    const cfg = loadConfig(cfgRaw);
 
     // Save into active project
     const p = getActiveProject();
@@ -841,7 +942,7 @@ function saveConfig() {
 
     // Hydrate state
     state.config = cfg;
-    state.calibration = calibrate(state.config);
+    state.calibration = calibrationFor(state.config);
 
     saveProjectsToLS();
     renderCalibration();
@@ -919,11 +1020,10 @@ function exportProject() {
   persistActiveProject();
   const fresh = getActiveProject();
 
-  const safe = JSON.parse(JSON.stringify(fresh));
-  const nameSafe = (safe.name || "proyecto").replace(/[^\w\- ]+/g, "").trim().replace(/\s+/g, "_");
+  const nameSafe = (fresh.name || "proyecto").replace(/[^\w\- ]+/g, "").trim().replace(/\s+/g, "_");
   const fname = `${nameSafe || "AppCarro_proyecto"}.json`;
 
-  downloadText(JSON.stringify(safe, null, 2), fname, "application/json;charset=utf-8");
+  downloadText(JSON.stringify(fresh, null, 2), fname, "application/json;charset=utf-8");
   toast("Proyecto exportado.");
 }
 
@@ -937,7 +1037,7 @@ async function importProjectFromFile(file) {
     if (!obj.name) obj.name = `Importado — ${new Date().toLocaleString()}`;
     if (!obj.configRaw) throw new Error("Proyecto sin configRaw.");
     // validate config
-    normalizeConfig(obj.configRaw);
+    loadConfig(obj.configRaw);
 
     // ensure fields
     obj.createdAt = obj.createdAt || isoNow();